@@ -1,8 +1,13 @@
 #!/usr/bin/env python3
 import argparse
+import concurrent.futures
 import getpass
+import http.client
 import json
+import os
+import queue
 import secrets
+import selectors
 import subprocess
 import sys
 import threading
@@ -13,6 +18,7 @@ import urllib.request
 import webbrowser
 from http.server import BaseHTTPRequestHandler, HTTPServer
 from pathlib import Path
+from typing import Optional
 
 REGION_AUDIENCE = {
     "na": "https://fleet-api.prd.na.vn.cloud.tesla.com",
@@ -23,6 +29,14 @@ TOKEN_HOST = "fleet-auth.prd.vn.cloud.tesla.com"
 AUTH_HOST = "auth.tesla.com"
 DEFAULT_SCOPE = "openid offline_access vehicle_device_data"
 KEY_REL_PATH = ".well-known/appspecific/com.tesla.3p.public-key.pem"
+CONFIG_DIR = Path.home() / ".config/tesla-notifier"
+
+# Idle keep-alive HTTPS connections per host, so repeated Fleet API calls skip the TLS handshake.
+_CONN_POOL: dict[str, list[http.client.HTTPSConnection]] = {}
+_CONN_POOL_LOCK = threading.Lock()
+
+# Partner (client_credentials) tokens keyed by token host, client id and audience -> (access_token, expiry epoch).
+_PARTNER_TOKEN_CACHE: dict[str, tuple[str, float]] = {}
 
 
 class UserCancelled(Exception):
@@ -71,81 +85,107 @@ def prompt_yes_no(label: str, default: bool) -> bool:
         print("Please answer yes or no.")
 
 
+def _acquire_connection(host: str) -> tuple[http.client.HTTPSConnection, bool]:
+    with _CONN_POOL_LOCK:
+        idle = _CONN_POOL.get(host)
+        if idle:
+            return idle.pop(), True
+    return http.client.HTTPSConnection(host, timeout=30), False
+
+
+def _release_connection(host: str, conn: http.client.HTTPSConnection) -> None:
+    with _CONN_POOL_LOCK:
+        _CONN_POOL.setdefault(host, []).append(conn)
+
+
+def request_json(method: str, url: str, headers: dict, body: Optional[bytes] = None) -> tuple[int, dict, str]:
+    parsed = urllib.parse.urlparse(url)
+    host = parsed.netloc
+    path = parsed.path or "/"
+    if parsed.query:
+        path += "?" + parsed.query
+    headers = {"Accept": "application/json", **headers}
+
+    while True:
+        conn, reused = _acquire_connection(host)
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            resp = conn.getresponse()
+            raw_bytes = resp.read()
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            conn.close()
+            if reused:
+                # Idle keep-alive socket was dropped by the server; retry on a fresh one.
+                # Timeouts and other errors propagate so a POST is never sent twice.
+                continue
+            raise
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            raise
+        if resp.will_close:
+            conn.close()
+        else:
+            _release_connection(host, conn)
+        break
+
+    if 200 <= resp.status < 300:
+        return resp.status, json.loads(raw_bytes) if raw_bytes else {}, ""
+
+    data = {}
+    try:
+        data = json.loads(raw_bytes) if raw_bytes else {}
+    except Exception:
+        pass
+    return resp.status, data, raw_bytes[:800].decode("utf-8", errors="replace")
+
+
 def post_form(url: str, form: dict) -> tuple[int, dict, str]:
     body = urllib.parse.urlencode(form).encode("utf-8")
-    req = urllib.request.Request(
-        url=url,
-        method="POST",
-        headers={"Content-Type": "application/x-www-form-urlencoded"},
-        data=body,
-    )
-    try:
-        with urllib.request.urlopen(req, timeout=30) as resp:
-            raw = resp.read().decode("utf-8")
-            return resp.status, json.loads(raw) if raw else {}, ""
-    except urllib.error.HTTPError as err:
-        raw = err.read().decode("utf-8", errors="replace")
-        data = {}
-        try:
-            data = json.loads(raw) if raw else {}
-        except Exception:
-            pass
-        return err.code, data, raw[:800]
+    return request_json("POST", url, {"Content-Type": "application/x-www-form-urlencoded"}, body)
 
 
 def post_json(url: str, bearer_token: str, payload: dict) -> tuple[int, dict, str]:
     body = json.dumps(payload).encode("utf-8")
-    req = urllib.request.Request(
-        url=url,
-        method="POST",
-        headers={
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {bearer_token}",
-            "Accept": "application/json",
-        },
-        data=body,
-    )
-    try:
-        with urllib.request.urlopen(req, timeout=30) as resp:
-            raw = resp.read().decode("utf-8")
-            data = json.loads(raw) if raw else {}
-            return resp.status, data, ""
-    except urllib.error.HTTPError as err:
-        raw = err.read().decode("utf-8", errors="replace")
-        data = {}
-        try:
-            data = json.loads(raw) if raw else {}
-        except Exception:
-            pass
-        return err.code, data, raw[:800]
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {bearer_token}",
+    }
+    return request_json("POST", url, headers, body)
 
 
 def get_json(url: str, bearer_token: str) -> tuple[int, dict, str]:
-    req = urllib.request.Request(
-        url=url,
-        method="GET",
-        headers={
-            "Authorization": f"Bearer {bearer_token}",
-            "Accept": "application/json",
-        },
-    )
-    try:
-        with urllib.request.urlopen(req, timeout=30) as resp:
-            raw = resp.read().decode("utf-8")
-            data = json.loads(raw) if raw else {}
-            return resp.status, data, ""
-    except urllib.error.HTTPError as err:
-        raw = err.read().decode("utf-8", errors="replace")
-        data = {}
-        try:
-            data = json.loads(raw) if raw else {}
-        except Exception:
-            pass
-        return err.code, data, raw[:800]
+    return request_json("GET", url, {"Authorization": f"Bearer {bearer_token}"})
 
 
 def generate_keypair(private_key: Path, public_key: Path) -> None:
     private_key.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import ec
+    except ImportError:  # stock macOS python3 ships without it; fall back to the openssl CLI
+        ec = None
+
+    if ec is not None:
+        key = ec.generate_private_key(ec.SECP256R1())
+        # Owner-only, matching what `openssl ecparam -genkey -out` produces.
+        fd = os.open(private_key, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.fchmod(fd, 0o600)
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(
+                key.private_bytes(
+                    serialization.Encoding.PEM,
+                    serialization.PrivateFormat.TraditionalOpenSSL,
+                    serialization.NoEncryption(),
+                )
+            )
+        public_key.write_bytes(
+            key.public_key().public_bytes(
+                serialization.Encoding.PEM,
+                serialization.PublicFormat.SubjectPublicKeyInfo,
+            )
+        )
+        return
+
     subprocess.run(
         ["openssl", "ecparam", "-name", "prime256v1", "-genkey", "-noout", "-out", str(private_key)],
         check=True,
@@ -207,22 +247,44 @@ def run_oauth_browser_flow(client_id: str, redirect_uri: str, scope: str, timeou
     except OSError as err:
         return "", f"Cannot bind callback server on {host}:{port}: {err}"
 
-    thread = threading.Thread(target=server.serve_forever, daemon=True)
-    thread.start()
-
     print("\nOpen this URL to authorize:")
     print(auth_url)
     if not no_open:
         webbrowser.open(auth_url)
 
-    started = time.time()
+    # Watch the listening socket and every accepted connection on one selector, and only run the handler on a
+    # connection once its request bytes arrive, so an idle browser preconnect never delays the real callback.
+    deadline = time.monotonic() + timeout_seconds
     try:
-        while time.time() - started < timeout_seconds:
-            if result["code"] or result["error"]:
-                break
-            time.sleep(0.2)
+        with selectors.DefaultSelector() as selector:
+            selector.register(server, selectors.EVENT_READ)
+            while not (result["code"] or result["error"]):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                for key, _events in selector.select(timeout=remaining):
+                    if key.fileobj is server:
+                        try:
+                            conn, client_address = server.get_request()
+                        except OSError:
+                            continue
+                        selector.register(conn, selectors.EVENT_READ, client_address)
+                        continue
+
+                    conn, client_address = key.fileobj, key.data
+                    selector.unregister(conn)
+                    # Never read past the overall deadline if a client stalls mid-request.
+                    Handler.timeout = max(deadline - time.monotonic(), 0.1)
+                    try:
+                        server.process_request(conn, client_address)
+                    except Exception:
+                        server.handle_error(conn, client_address)
+                        server.shutdown_request(conn)
+
+            for key in list(selector.get_map().values()):
+                if key.fileobj is not server:
+                    server.shutdown_request(key.fileobj)
     finally:
-        server.shutdown()
         server.server_close()
 
     if result["error"]:
@@ -255,7 +317,7 @@ def normalize_region_list(value: str) -> list[str]:
     return out
 
 
-def build_partner_token(token_host: str, client_id: str, client_secret: str, audience: str) -> tuple[str, str]:
+def build_partner_token(token_host: str, client_id: str, client_secret: str, audience: str) -> tuple[str, int, str]:
     status, data, raw_err = post_form(
         f"https://{token_host}/oauth2/v3/token",
         {
@@ -268,23 +330,40 @@ def build_partner_token(token_host: str, client_id: str, client_secret: str, aud
     )
     if status < 200 or status >= 300:
         reason = data.get("error_description") or data.get("error") or raw_err
-        return "", f"partner token failed ({status}): {reason}"
+        return "", 0, f"partner token failed ({status}): {reason}"
     token = data.get("access_token", "")
     if not token:
-        return "", f"partner token missing access_token: {json.dumps(data)}"
+        return "", 0, f"partner token missing access_token: {json.dumps(data)}"
+    try:
+        expires_in = int(data.get("expires_in"))
+    except (TypeError, ValueError):
+        expires_in = 300
+    return token, expires_in, ""
+
+
+def get_partner_token(token_host: str, client_id: str, client_secret: str, audience: str) -> tuple[str, str]:
+    cache_key = f"{token_host}|{client_id}|{audience}"
+    cached = _PARTNER_TOKEN_CACHE.get(cache_key)
+    if cached and time.time() < cached[1] - 30:
+        return cached[0], ""
+
+    token, expires_in, err = build_partner_token(token_host, client_id, client_secret, audience)
+    if err:
+        return "", err
+    _PARTNER_TOKEN_CACHE[cache_key] = (token, time.time() + expires_in)
     return token, ""
 
 
-def register_partner_account(audience: str, partner_token: str, domain: str, key_url: str) -> tuple[bool, str]:
+def register_partner_account(audience: str, partner_token: str, domain: str, key_url: str) -> tuple[bool, str, dict]:
     endpoint = f"{audience}/api/1/partner_accounts"
 
     status, payload, raw_err = post_json(endpoint, partner_token, {"domain": domain})
     if 200 <= status < 300:
-        return True, "registered"
+        return True, "registered", payload
 
     status2, payload2, raw_err2 = post_json(endpoint, partner_token, {"domain": domain, "public_key_url": key_url})
     if 200 <= status2 < 300:
-        return True, "registered"
+        return True, "registered", payload2
 
     merged = payload2 or payload or {}
     err_text = ""
@@ -295,9 +374,9 @@ def register_partner_account(audience: str, partner_token: str, domain: str, key
 
     low = err_text.lower()
     if "already" in low and "register" in low:
-        return True, "already_registered"
+        return True, "already_registered", {}
 
-    return False, f"HTTP {status2}: {err_text}" if err_text else f"HTTP {status2}"
+    return False, (f"HTTP {status2}: {err_text}" if err_text else f"HTTP {status2}"), {}
 
 
 def verify_public_key(audience: str, partner_token: str, domain: str) -> tuple[bool, str]:
@@ -311,10 +390,52 @@ def verify_public_key(audience: str, partner_token: str, domain: str) -> tuple[b
     return False, f"HTTP {status}: {reason}"
 
 
+def register_region(
+    region: str,
+    token_host: str,
+    client_id: str,
+    client_secret: str,
+    domain: str,
+    key_url: str,
+) -> tuple[str, bool, str, str, bool]:
+    audience = REGION_AUDIENCE[region]
+    partner_token, partner_err = get_partner_token(token_host, client_id, client_secret, audience)
+    if partner_err:
+        return region, False, partner_err, "", False
+
+    ok, register_msg, register_payload = register_partner_account(audience, partner_token, domain, key_url)
+    if not ok:
+        return region, False, f"Partner registration failed: {register_msg}", "", True
+
+    # A fresh registration echoes the account including the stored public key; only query it separately otherwise.
+    account = register_payload.get("response") if isinstance(register_payload, dict) else None
+    if isinstance(account, dict) and account.get("public_key"):
+        return region, True, register_msg, "returned by registration", False
+
+    verified, verify_msg = verify_public_key(audience, partner_token, domain)
+    key_status = "verified" if verified else f"verify failed ({verify_msg})"
+    return region, True, register_msg, key_status, False
+
+
 def detect_user_region_with_token(access_token: str) -> tuple[str, str]:
+    results = queue.Queue()
+
+    def probe(region: str):
+        try:
+            results.put((region, get_json(f"{REGION_AUDIENCE[region]}/api/1/users/region", access_token)))
+        except Exception:
+            results.put((region, None))
+
     for region in REGION_ORDER:
-        audience = REGION_AUDIENCE[region]
-        status, payload, _raw_err = get_json(f"{audience}/api/1/users/region", access_token)
+        # Daemon threads so a slower losing probe never holds up interpreter exit.
+        threading.Thread(target=probe, args=(region,), daemon=True).start()
+
+    reachable = set()
+    for _ in REGION_ORDER:
+        region, outcome = results.get()
+        if outcome is None:
+            continue
+        status, payload, _raw_err = outcome
         if 200 <= status < 300:
             response = payload.get("response") if isinstance(payload, dict) else None
             fleet_url = ""
@@ -322,7 +443,11 @@ def detect_user_region_with_token(access_token: str) -> tuple[str, str]:
                 fleet_url = str(response.get("fleet_api_base_url") or "").strip()
             if fleet_url:
                 return fleet_url.rstrip("/"), ""
-            return audience, ""
+            reachable.add(region)
+
+    for region in REGION_ORDER:
+        if region in reachable:
+            return REGION_AUDIENCE[region], ""
     return "", "Could not determine user region from /users/region"
 
 
@@ -366,12 +491,13 @@ def interactive_fill(args: argparse.Namespace) -> argparse.Namespace:
             "Regions to register (comma-separated: eu,na)",
             default_regions,
         )
-        regions = normalize_region_list(regions_text)
-        if not regions:
-            regions = list(args.register_regions)
-        args.register_regions = regions
+        if regions_text != default_regions:
+            regions = normalize_region_list(regions_text)
+            if regions:
+                args.register_regions = regions
 
-        args.domain = parse_domain(args.domain or prompt_text("App domain from Tesla allowed_origins (example.com)"))
+        if not args.domain:
+            args.domain = parse_domain(prompt_text("App domain from Tesla allowed_origins (example.com)"))
         args.generate_keys = args.generate_keys or prompt_yes_no("Generate new EC key pair files", True)
         run_key_check = prompt_yes_no("Validate hosted public key URL now", False)
         args.skip_public_key_check = not run_key_check
@@ -396,8 +522,8 @@ def main() -> int:
     parser.add_argument("--skip-register", action="store_true", help="Skip partner register flow")
     parser.add_argument("--register-regions", default="eu,na", help="Comma-separated regions to register (eu,na)")
     parser.add_argument("--domain", help="App domain that matches Tesla allowed_origins")
-    parser.add_argument("--private-key-file", default=str(Path.home() / ".config/tesla-notifier/private-key.pem"))
-    parser.add_argument("--public-key-file", default=str(Path.home() / ".config/tesla-notifier/public-key.pem"))
+    parser.add_argument("--private-key-file", default=str(CONFIG_DIR / "private-key.pem"))
+    parser.add_argument("--public-key-file", default=str(CONFIG_DIR / "public-key.pem"))
     parser.add_argument("--generate-keys", action="store_true", help="Generate EC key pair before registration")
     parser.add_argument("--skip-public-key-check", action="store_true", help="Skip HTTPS public-key URL check")
 
@@ -415,7 +541,8 @@ def main() -> int:
     if not args.register_regions:
         args.register_regions = ["eu", "na"]
 
-    args.domain = parse_domain(args.domain or "")
+    if args.domain:
+        args.domain = parse_domain(args.domain)
 
     try:
         if interactive:
@@ -460,10 +587,12 @@ def main() -> int:
                         headers={
                             "User-Agent": "Mozilla/5.0",
                             "Accept": "text/plain,*/*;q=0.8",
+                            # The PEM header is all we check; servers ignoring Range reply 200 and get cut off below.
+                            "Range": "bytes=0-255",
                         },
                     )
                     with urllib.request.urlopen(req, timeout=10) as resp:
-                        content = resp.read().decode("utf-8", errors="replace")
+                        content = resp.read(256).decode("utf-8", errors="replace")
                         if "BEGIN PUBLIC KEY" not in content:
                             print("Public key URL is reachable but not a valid PEM public key.")
                             return 1
@@ -473,27 +602,34 @@ def main() -> int:
                     return 1
 
             print("\nRegistering partner account in requested regions...")
-            for region in args.register_regions:
-                audience = REGION_AUDIENCE[region]
-                partner_token, partner_err = build_partner_token(
-                    args.token_host,
-                    args.client_id,
-                    args.client_secret,
-                    audience,
+            with concurrent.futures.ThreadPoolExecutor(max_workers=len(args.register_regions)) as executor:
+                results = list(
+                    executor.map(
+                        lambda region: register_region(
+                            region,
+                            args.token_host,
+                            args.client_id,
+                            args.client_secret,
+                            args.domain,
+                            key_url,
+                        ),
+                        args.register_regions,
+                    )
                 )
-                if partner_err:
-                    print(f"[{region.upper()}] {partner_err}")
-                    return 1
 
-                ok, register_msg = register_partner_account(audience, partner_token, args.domain, key_url)
+            failed = False
+            registration_failed = False
+            for region, ok, register_msg, key_status, region_registration_failed in results:
                 if not ok:
-                    print(f"[{region.upper()}] Partner registration failed: {register_msg}")
-                    print("Hint: ensure domain exactly matches your Tesla app allowed_origins root domain.")
-                    return 1
-
-                verified, verify_msg = verify_public_key(audience, partner_token, args.domain)
-                status = "verified" if verified else f"verify failed ({verify_msg})"
-                print(f"[{region.upper()}] registration: {register_msg}; public key: {status}")
+                    print(f"[{region.upper()}] {register_msg}")
+                    failed = True
+                    registration_failed = registration_failed or region_registration_failed
+                    continue
+                print(f"[{region.upper()}] registration: {register_msg}; public key: {key_status}")
+            if registration_failed:
+                print("Hint: ensure domain exactly matches your Tesla app allowed_origins root domain.")
+            if failed:
+                return 1
     except UserCancelled:
         print("\nCancelled by user.")
         return 130